@@ -1,98 +1,82 @@
-from flask import Flask, request, jsonify
-from openai import OpenAI
-import os
-import re
+from flask import Flask
 import logging
-from dotenv import load_dotenv
-
-# .env file load
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set.")
-client = OpenAI(api_key=api_key)
+from common import get_client, json_response, read_json, PredictionCache
+from name_rules import (
+    VALID_MODELS, BINARY_LOGIT_BIAS, PROMPT_TEMPLATE, normalize_name, precheck_name, is_whitelisted
+)
 
 # Create Flask app
 app = Flask(__name__)
-
-# Logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Allowed models
-VALID_MODELS = ["gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "gpt-4o-mini"]
-
-def precheck_name(name):
-    # 1) Invalid characters
-    if re.search(r"[^A-Za-z\s\-.]", name):
-        return False, "Invalid characters"
-    # 2) At least 3 letters
-    if len(re.findall(r"[A-Za-z]", name)) < 3:
-        return False, "Too few letters"
-    # 3) No consecutive hyphens/dots
-    if '--' in name or '..' in name:
-        return False, "Consecutive punctuation"
-    # 4) Dot must have spaces around it
-    if re.search(r"(?<=\w)\.(?=\w)", name):
-        return False, "Invalid dot formatting"
-    return True, None
+# Cache namespaced to this app and prompt
+cache = PredictionCache("app-precheck-prompt-enhanment", PROMPT_TEMPLATE)
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    data = request.get_json() or {}
-    name = data.get('name', '').strip()
+    data = read_json() or {}
+    # Fail fast on the model before touching the name
     model = data.get('model', 'gpt-4o-mini')
-    name = re.sub(r'\s+', ' ', name)
+    if model not in VALID_MODELS:
+        return json_response({"error": f"Invalid model. Choose from {sorted(VALID_MODELS)}"}), 400
 
-    # Camel-case conversion
-    name = ' '.join(word[:1].upper() + word[1:].lower() for word in name.split())
+    name = normalize_name(data.get('name', ''))
 
     if not name:
-        return jsonify({"error": "No name provided"}), 400
-    if model not in VALID_MODELS:
-        return jsonify({"error": f"Invalid model. Choose from {VALID_MODELS}"}), 400
+        return json_response({"error": "No name provided"}), 400
 
     # Pre-validation
     valid, reason = precheck_name(name)
     if not valid:
-        logger.info(f"Pre-check failed for '{name}': {reason}")
-        return jsonify({
+        logger.info("Pre-check failed for '%s': %s", name, reason)
+        return json_response({
             "name": name,
             "prediction": "Not Realistic"
             #,"reason": reason
         }), 200
 
-    # Minimal prompt for 1/0
-    prompt = f"Classify '{name}' as a realistic human name (single-word OK). Return only 1 or 0."
+    # Whitelisted well-known names skip the model
+    if is_whitelisted(name):
+        logger.info("Whitelist accepted '%s'", name)
+        return json_response({"name": name, "prediction": "Realistic"}), 200
+
+    cached, cache_status = cache.get(model, name)
+    if cached:
+        logger.info("Cache %s for name='%s' with model=%s", cache_status, name, model)
+        return json_response(dict(cached, name=name)), 200, {"X-Cache": cache_status}
+
+    prompt = PROMPT_TEMPLATE.format(name=name)
 
     try:
-        logger.info(f"Calling OpenAI with model={model} for name='{name}'")
-        response = client.chat.completions.create(
+        logger.info("Calling OpenAI with model=%s for name='%s'", model, name)
+        response = get_client().chat.completions.create(
             model=model,
             messages=[
                 {"role": "user", "content": prompt}
             ],
             max_tokens=1,
-            temperature=0.0
+            temperature=0.0,
+            logit_bias=BINARY_LOGIT_BIAS[model]
         )
 
         reply = response.choices[0].message.content.strip()
         digit = reply[0] if reply else ''
-        logger.info(f"Model returned: '{reply}'")
+        logger.info("Model returned: '%s'", reply)
 
         if digit == '1':
-            return jsonify({"name": name, "prediction": "Realistic"}), 200
+            body = {"name": name, "prediction": "Realistic"}
         elif digit == '0':
-            return jsonify({"name": name, "prediction": "Not Realistic"}), 200
+            body = {"name": name, "prediction": "Not Realistic"}
         else:
-            logger.error(f"Unexpected model output: {reply}")
-            return jsonify({"error": "Invalid response from model"}), 500
+            logger.error("Unexpected model output: %s", reply)
+            return json_response({"error": "Invalid response from model"}), 500
+
+        cache.set(model, name, body)
+        return json_response(body), 200, {"X-Cache": "MISS"}
 
     except Exception as e:
-        logger.error(f"OpenAI API error: {e}")
-        return jsonify({"error": "OpenAI API error"}), 500
+        logger.error("OpenAI API error: %s", e)
+        return json_response({"error": "OpenAI API error"}), 500
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -1,80 +1,101 @@
-from flask import Flask, request, jsonify
-from openai import OpenAI
-import os
+from flask import Flask
 import re
 import json
 import logging
-from dotenv import load_dotenv
-
-# .env file load
-load_dotenv()
-
-# Initialize OpenAI client with your API key
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set. Make sure you have a .env file with this key.")
-client = OpenAI(api_key=api_key)
+from functools import lru_cache
+from common import get_client, json_response, read_json, PredictionCache
+from name_rules import VALID_MODELS, MULTISPACE, VALID_CHAR_TABLE, BAD_DOT, blacklist_reason, is_whitelisted
 
 # Create Flask app
 app = Flask(__name__)
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Valid OpenAI models
-VALID_MODELS = ["gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "gpt-4o-mini"]
+# Prompts
+SYSTEM_PROMPT = "You are a precise name classification assistant outputting only JSON."
+PROMPT_TEMPLATE = """
+You are an expert in name classification. Determine if the name '{name}' is realistic human name. Single-word names are allowed. Ignore the case.
+Examples of realistic names: 'Mst Nodi', 'Md Hafijul', 'Mst Taslima', 'Mr. Hanif Uddin', 'Beauty','Md Jewel', 'Mst Sonia'
+
+Respond only with JSON:
+- Realistic: {{"prediction":"Realistic"}}
+- Not Realistic: {{"prediction":"Not Realistic","reason":"<≤50‑char reason>"}}
+"""
+
+# Cache namespaced to this app and prompt
+cache = PredictionCache("app-precheck", SYSTEM_PROMPT, PROMPT_TEMPLATE)
 
-# Pre-check validation function
+# Precompiled patterns
+_JSON_FENCE = re.compile(r"```json\s*({.*?})\s*```", re.DOTALL | re.IGNORECASE)
+
+# Pre-check validation function (cheapest checks first, regex scans last).
+# Pure function of the name, so results are memoized; check precheck_name.cache_info() for the hit rate.
+@lru_cache(maxsize=8192)
 def precheck_name(name):
-    # Invalid characters
-    if re.search(r"[^A-Za-z\s\-.]", name):
-        return False, "Invalid characters present"
-    # Letter count
-    letters = re.findall(r"[A-Za-z]", name)
-    if len(letters) < 3:
+    # Too short to hold three letters
+    if len(name) < 3:
         return False, "Too few letters"
     # Consecutive hyphens or dots
     if '--' in name or '..' in name:
         return False, "Consecutive punctuation"
+    # Invalid characters
+    if b'\x01' in name.encode('ascii', 'replace').translate(VALID_CHAR_TABLE):
+        return False, "Invalid characters present"
     # Dot must have spaces: no letter.dot.letter patterns
-    if re.search(r"(?<=\w)\.(?=\w)", name):
+    if BAD_DOT.search(name):
         return False, "Invalid dot formatting, must have spaces after dot(.)"
+    # Letter count (only ASCII letters remain after the character check)
+    if sum(1 for c in name if c.isalpha()) < 3:
+        return False, "Too few letters"
+    # Deterministic blacklist: keyboard runs, common non-name words.
+    # Doubled syllables are not rejected: single-word names like 'Mimi' are allowed here.
+    reason = blacklist_reason(name, repeat_syllables=False)
+    if reason:
+        return False, reason
     return True, None
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """API endpoint to predict if a name is realistic using OpenAI."""
     try:
-        data = request.get_json()
+        data = read_json()
         if not data:
-            return jsonify({"error": "Invalid JSON payload"}), 400
+            return json_response({"error": "Invalid JSON payload"}), 400
 
-        name = data.get('name', '').strip()
+        # Validate the model first; it is a cheap set lookup
         model = data.get('model', 'gpt-4.1-nano')  # Default to gpt-4.1-nano
-        name = re.sub(r'\s+', ' ', name).strip()  # Normalize spaces
-        # Convert each word's first character to uppercase, rest to lowercase
-        name = ' '.join([word[:1].upper() + word[1:].lower() for word in name.split()])
+        if model not in VALID_MODELS:
+            logger.warning("Invalid model specified: %s", model)
+            return json_response({"error": f"Invalid model. Choose from {sorted(VALID_MODELS)}"}), 400
+
+        name = data.get('name', '').strip()
+        # Normalize spaces and title-case each word (also after hyphens, e.g. 'John-Doe')
+        name = MULTISPACE.sub(' ', name).title()
 
         if not name:
             logger.warning("Received request with no name.")
-            return jsonify({"error": "No name provided"}), 400
+            return json_response({"error": "No name provided"}), 400
 
         # Pre-check before OpenAI call
         valid, reason = precheck_name(name)
         if not valid:
-            logger.info(f"'{name}' rejected from pre-check with reason: {reason}")
-            return jsonify({
+            logger.info("'%s' rejected from pre-check with reason: %s", name, reason)
+            return json_response({
                 "name": name,
                 "prediction": "Not Realistic",
                 "reason": reason
             }), 200
         
-        logger.info(f"'{name}' passed local checks. Proceeding to OpenAI validation with model '{model}'.")
+        logger.info("'%s' passed local checks. Proceeding to OpenAI validation with model '%s'.", name, model)
 
-        if model not in VALID_MODELS:
-            logger.warning(f"Invalid model specified: {model}")
-            return jsonify({"error": f"Invalid model. Choose from {VALID_MODELS}"}), 400
+        # Well-known single-word names are accepted without calling OpenAI
+        if is_whitelisted(name):
+            logger.info("'%s' accepted from whitelist.", name)
+            return json_response({"name": name, "prediction": "Realistic"}), 200
+
+        cached, cache_status = cache.get(model, name)
+        if cached:
+            logger.info("Cache %s for name: '%s' with model: '%s'", cache_status, name, model)
+            return json_response(dict(cached, name=name)), 200, {"X-Cache": cache_status}
 
         # Build prompt
         # prompt = f"""
@@ -84,22 +105,14 @@ def predict():
         # - If not: {{"prediction":"Not Realistic","reason":"<≤50‑char reason>"}}
         # """
 
-        # Build prompt
-        prompt = f"""
-        You are an expert in name classification. Determine if the name '{name}' is realistic human name. Single-word names are allowed. Ignore the case.
-        Examples of realistic names: 'Mst Nodi', 'Md Hafijul', 'Mst Taslima', 'Mr. Hanif Uddin', 'Beauty','Md Jewel', 'Mst Sonia'
-               
-        Respond only with JSON:
-        - Realistic: {{"prediction":"Realistic"}}
-        - Not Realistic: {{"prediction":"Not Realistic","reason":"<≤50‑char reason>"}}
-        """
+        prompt = PROMPT_TEMPLATE.format(name=name)
 
         try:
-            logger.info(f"Calling OpenAI API for name: '{name}' with model: '{model}'")
-            response = client.chat.completions.create(
+            logger.info("Calling OpenAI API for name: '%s' with model: '%s'", name, model)
+            response = get_client().chat.completions.create(
                 model=model,
                 messages=[
-                    {"role": "system", "content": "You are a precise name classification assistant outputting only JSON."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=60,
@@ -107,9 +120,9 @@ def predict():
             )
 
             reply_content = response.choices[0].message.content.strip()
-            logger.info(f"Received raw response: {reply_content}")
+            logger.info("Received raw response: %s", reply_content)
             # Extract JSON
-            match = re.search(r"```json\s*({.*?})\s*```", reply_content, re.DOTALL|re.IGNORECASE)
+            match = _JSON_FENCE.search(reply_content)
             json_str = match.group(1) if match else reply_content
 
             try:
@@ -120,28 +133,30 @@ def predict():
                     raise ValueError(f"Invalid prediction value from model: {pred}")
 
                 if pred == "Realistic":
-                    return jsonify({"name": name, "prediction": "Realistic"}), 200
+                    body = {"name": name, "prediction": "Realistic"}
                 else:
-                    return jsonify({
+                    body = {
                         "name": name,
                         "prediction": "Not Realistic",
                         "reason": result.get("reason", "Reason not provided by AI.")
-                    }), 200
+                    }
+                cache.set(model, name, body)
+                return json_response(body), 200, {"X-Cache": "MISS"}
 
             except json.JSONDecodeError:
-                logger.error(f"Failed to decode JSON response: '{json_str}'")
-                return jsonify({"error": "Invalid JSON response format from model"}), 500
+                logger.error("Failed to decode JSON response: '%s'", json_str)
+                return json_response({"error": "Invalid JSON response format from model"}), 500
             except ValueError as ve:
-                logger.error(f"Prediction validation error: {str(ve)}")
-                return jsonify({"error": str(ve)}), 500
+                logger.error("Prediction validation error: %s", ve)
+                return json_response({"error": str(ve)}), 500
 
         except Exception as api_error:
-            logger.error(f"OpenAI API call failed: {str(api_error)}")
-            return jsonify({"error": f"OpenAI API error: {str(api_error)}"}), 500
+            logger.error("OpenAI API call failed: %s", api_error)
+            return json_response({"error": f"OpenAI API error: {str(api_error)}"}), 500
 
     except Exception as e:
-        logger.exception(f"An unexpected server error occurred: {str(e)}")
-        return jsonify({"error": "An unexpected server error occurred"}), 500
+        logger.exception("An unexpected server error occurred: %s", e)
+        return json_response({"error": "An unexpected server error occurred"}), 500
 
 # --- Run the Flask App ---
 if __name__ == '__main__':
@@ -1,181 +1,195 @@
-from flask import Flask, request, jsonify
-from openai import OpenAI
-import os
+from flask import Flask
 import re
-import json
 import logging
-from dotenv import load_dotenv
-
-# .env file load
-load_dotenv()
-
-# Initialize OpenAI client with your API key
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set. Make sure you have a .env file with this key.")
-client = OpenAI(api_key=api_key)
+from common import get_client, json_response, read_json, PredictionCache
+from name_rules import VALID_MODELS, BINARY_LOGIT_BIAS, MULTISPACE, blacklist_reason, is_whitelisted
 
 # Create Flask app
 app = Flask(__name__)
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Valid OpenAI models
-VALID_MODELS = ["gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "gpt-4o-mini"]
+# Precompiled patterns
+_BATCH_LINE = re.compile(r"^\s*(\d+)\s*[.):-]?\s*([01])\b", re.MULTILINE)
+
+# Max names accepted by /predict_batch in one request
+MAX_BATCH_SIZE = 100
 
-def extract_json_from_response(text):
-    """Extracts JSON content, potentially removing markdown fences."""
-    match = re.search(r"```json\s*({.*?})\s*```", text, re.DOTALL | re.IGNORECASE)
-    if match:
-        return match.group(1)
-    text = text.strip()
-    if text.startswith('{') and text.endswith('}'):
-        return text
-    return text
+# Prompts; logit_bias pins the single /predict output token to '0' or '1'
+PROMPT_TEMPLATE = "Is '{name}' a realistic human full name? Reply 1 or 0."
+BATCH_SYSTEM_PROMPT = "You are a precise name classification assistant."
+BATCH_PROMPT = (
+    "Classify each name as a realistic human name: Realistic(1) or Not(0). "
+    "Reply one per line as '<number>. <1 or 0>' and nothing else:\n"
+)
+
+# Separate cache namespaces: the batch prompt can answer differently from the single-name one
+cache = PredictionCache("app", PROMPT_TEMPLATE)
+batch_cache = PredictionCache("app-batch", BATCH_SYSTEM_PROMPT, BATCH_PROMPT)
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """API endpoint to predict if a name is realistic using OpenAI."""
     try:
-        data = request.get_json()
+        data = read_json()
         if not data:
-            return jsonify({"error": "Invalid JSON payload"}), 400
+            return json_response({"error": "Invalid JSON payload"}), 400
 
-        name = data.get('name', '').strip()
+        # Validate the model first; it is a cheap set lookup
         model = data.get('model', 'gpt-4.1-nano')  # Default to gpt-4.1-nano
-        name = re.sub(r'\s+', ' ', name).strip()  # Normalize spaces
+        if model not in VALID_MODELS:
+            logger.warning("Invalid model specified: %s", model)
+            return json_response({"error": f"Invalid model. Choose from {sorted(VALID_MODELS)}"}), 400
+
+        name = data.get('name', '').strip()
+        name = MULTISPACE.sub(' ', name).strip()  # Normalize spaces
 
         if not name:
             logger.warning("Received request with no name.")
-            return jsonify({"error": "No name provided"}), 400
-
-        if model not in VALID_MODELS:
-            logger.warning(f"Invalid model specified: {model}")
-            return jsonify({"error": f"Invalid model. Choose from {VALID_MODELS}"}), 400
+            return json_response({"error": "No name provided"}), 400
+
+        # Deterministic decisions need no OpenAI call
+        reason = blacklist_reason(name)
+        if reason:
+            logger.info("'%s' rejected by deterministic blacklist: %s", name, reason)
+            return json_response({"name": name, "prediction": "Not Realistic", "reason": reason}), 200
+        if is_whitelisted(name):
+            logger.info("'%s' accepted from whitelist.", name)
+            return json_response({"name": name, "prediction": "Realistic"}), 200
+
+        cached, cache_status = cache.get(model, name)
+        if cached:
+            logger.info("Cache %s for name: '%s' with model: '%s'", cache_status, name, model)
+            return json_response(dict(cached, name=name)), 200, {"X-Cache": cache_status}
 
         # --- If Local Validation Passed, Proceed to OpenAI ---
-        logger.info(f"'{name}' passed local checks. Proceeding to OpenAI validation with model '{model}'.")
-
-        # prompt = f"""
-        # You are an expert in name classification. Determine if the full name '{name}' is a realistic human full name, used in any culture.
-        # Consider the name regardless of its capitalization. 
-
-        # A name is considered unrealistic if:
-        # * It contains characters other than letters (a-z, A-Z), spaces, hyphens (-), and dots (.).
-        # * It is less than three letter in total (excluding spaces, hyphens, and dots).
-        # * It contains consecutive hyphens (e.g., '--') or consecutive dots (e.g., '..').
-        # * It has a dot ('.') without spaces around it, resembling an email address or username (e.g., 'm.ahmed', 'Ravi.kumar').
-
-        # Examples of realistic names: 'Mohiuddin Mohi', 'Aisha Khan', 'Sheik Kaykaus', 'Mr. Hanif Uddin', 'John-Doe', 'Mary. Anne Smith', 'm. a. h. hashan', 'p. k. robi mullah'.
-        # Examples of unrealistic names: 'Abdullah123'(contains numbers), 'Table Chair'(common phrase), 'Qwert' (Keyboard Pattern).
-
-        # Respond in JSON format. If the full name is 'Realistic', the JSON should only contain:
-        # {{
-        #     "prediction": "Realistic"
-        # }}
-        # If the name is 'Not Realistic', the JSON should contain:
-        # {{
-        #     "prediction": "Not Realistic",
-        #     "reason": "<brief reason (max 50 character) why the name is not realistic>"
-        # }}
-        # """
-        prompt = f"""
-        You are an expert in name classification. Determine if the full name '{name}' is a realistic human full name, used in any culture. Consider the name regardless of its capitalization.
-
-        A full name is considered unrealistic if:
-        * It contains characters other than letters (a-z, A-Z), spaces, hyphens (-), and dots (.).
-        * It has fewer than three letters in total (excluding spaces, hyphens, and dots). For example, 'Ku' has two letters and is unrealistic.
-        * It contains consecutive hyphens (e.g., '--') or consecutive dots (e.g., '..').
-        * It has a dot ('.') without spaces around it, resembling an email address or username (e.g., 'm.ahmed', 'Ravi.kumar').
-        * It is a single word without a clear first and last name, unless it is a widely recognized full name in a specific culture. For example, 'Baba' is a single word and unrealistic, while 'Leonardo da Vinci' is realistic.
-
-        Examples of realistic full names: 'Mohiuddin Mohi', 'Aisha Khan', 'Sheik Kaykaus', 'Mr. Hanif Uddin', 'John-Doe', 'Mary. Anne Smith', 'm. a. h. hashan', 'p. k. robi mullah', 'Leonardo da Vinci'.
-        Examples of unrealistic names: 'Ku' (too short), 'Ghi' (single word), 'Baba' (single word), 'Vut' (single word), 'San' (single word), 'TUTU' (single word), 'Ami' (single word), 'Ash' (single word), 'Nono' (single word), 'Pon' (single word), 'Nav' (single word), 'Sisi' (single word), 'Wert' (keyboard pattern), 'Ji' (too short), 'Zaza' (single word), 'Li' (too short), 'Jahanara--Begum' (consecutive hyphens), 'Fu' (too short), 'PAPA' (single word), 'Dede' (single word), 'Abdullah123' (contains numbers), 'Table Chair' (common phrase), 'Qwert' (keyboard pattern), 'Abdullah' (single word).
-
-        Respond in JSON format. If the full name is 'Realistic', the JSON should only contain:
-        {{
-            "prediction": "Realistic"
-        }}
-        If the name is 'Not Realistic', the JSON should contain:
-        {{
-            "prediction": "Not Realistic",
-            "reason": "<brief reason (max 50 character) why the name is not realistic>"
-        }}
-        """
-        # prompt = f"""
-        # Classify the full name "{name}" (any capitalization) as realistic or not.  
-        # Respond in JSON format. If the full name is 'Realistic', the JSON should only contain:
-        # {{
-        #     "prediction": "Realistic"
-        # }}
-        # If the name is 'Not Realistic', the JSON should contain:
-        # {{
-        #     "prediction": "Not Realistic",
-        #     "reason": "<≤50‑char reason"
-        # }}
-
-        # Unrealistic if any of:
-        # • Non‑letter (A–Z) chars other than space, hyphen, dot  
-        # • Fewer than 3 letters total (e.g., 'Ku')  
-        # • “--” or “..” present (e.g., 'Ravi--Kumar')  
-        # • A dot touching letters without spaces (e.g., 'm.ahmed')  
-        # • Single word (unless a culturally recognized full name, e.g., 'Madonna')
-
-        # Note: Titles like 'Mr. Smith' are realistic if the dot is followed by a space.
-        # """
-
-        
+        logger.info("'%s' passed local checks. Proceeding to OpenAI validation with model '%s'.", name, model)
+
+        prompt = PROMPT_TEMPLATE.format(name=name)
+
         try:
-            logger.info(f"Calling OpenAI API for name: '{name}' with model: '{model}'")
-            response = client.chat.completions.create(
+            logger.info("Calling OpenAI API for name: '%s' with model: '%s'", name, model)
+            response = get_client().chat.completions.create(
                 model=model,
                 messages=[
-                    {"role": "system", "content": "You are a precise name classification assistant outputting only JSON."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=60,
-                temperature=0.5
+                max_tokens=1,
+                temperature=0,
+                logit_bias=BINARY_LOGIT_BIAS[model]
             )
 
             reply_content = response.choices[0].message.content.strip()
-            logger.info(f"Received raw response: {reply_content}")
-            json_str_to_parse = extract_json_from_response(reply_content)
+            logger.info("Received raw response: %s", reply_content)
+            digit = reply_content[0] if reply_content else ''
 
-            try:
-                result = json.loads(json_str_to_parse)
-                prediction_value = result.get("prediction")
-
-                if prediction_value not in ["Realistic", "Not Realistic"]:
-                    raise ValueError(f"Invalid prediction value from model: {prediction_value}")
-
-                if prediction_value == "Realistic":
-                    return jsonify({
-                        "name": name,
-                        "prediction": "Realistic"
-                    }), 200
-                elif prediction_value == "Not Realistic":
-                    return jsonify({
-                        "name": name,
-                        "prediction": "Not Realistic",
-                        "reason": result.get("reason", "Reason not provided by AI.")
-                    }), 200
-
-            except json.JSONDecodeError:
-                logger.error(f"Failed to decode JSON response: '{json_str_to_parse}'")
-                return jsonify({"error": "Invalid JSON response format from model"}), 500
-            except ValueError as ve:
-                logger.error(f"Prediction validation error: {str(ve)}")
-                return jsonify({"error": str(ve)}), 500
+            if digit not in ('1', '0'):
+                logger.error("Unexpected model output: '%s'", reply_content)
+                return json_response({"error": "Invalid response from model"}), 500
+
+            body = {
+                "name": name,
+                "prediction": "Realistic" if digit == '1' else "Not Realistic"
+            }
+            cache.set(model, name, body)
+            return json_response(body), 200, {"X-Cache": "MISS"}
 
         except Exception as api_error:
-            logger.error(f"OpenAI API call failed: {str(api_error)}")
-            return jsonify({"error": f"OpenAI API error: {str(api_error)}"}), 500
+            logger.error("OpenAI API call failed: %s", api_error)
+            return json_response({"error": f"OpenAI API error: {str(api_error)}"}), 500
+
+    except Exception as e:
+        logger.exception("An unexpected server error occurred: %s", e)
+        return json_response({"error": f"An unexpected server error occurred"}), 500
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """API endpoint to classify many names with a single OpenAI call."""
+    try:
+        data = read_json()
+        if not data or not isinstance(data.get('names'), list):
+            return json_response({"error": "Invalid JSON payload, expected a 'names' list"}), 400
+
+        model = data.get('model', 'gpt-4.1-nano')  # Default to gpt-4.1-nano
+        if model not in VALID_MODELS:
+            logger.warning("Invalid model specified: %s", model)
+            return json_response({"error": f"Invalid model. Choose from {sorted(VALID_MODELS)}"}), 400
+
+        # Non-string items are reported per item below, not coerced to text
+        names = [MULTISPACE.sub(' ', name).strip() if isinstance(name, str) else name for name in data['names']]
+        if not names:
+            return json_response({"error": "No names provided"}), 400
+        if len(names) > MAX_BATCH_SIZE:
+            return json_response({"error": f"Too many names. Send at most {MAX_BATCH_SIZE} per batch"}), 400
+
+        # Decide what we can locally or from the cache; only the rest goes to OpenAI
+        results = [None] * len(names)
+        lookup = []
+        for idx, name in enumerate(names):
+            if not isinstance(name, str):
+                results[idx] = {"name": name, "error": "Invalid name"}
+                continue
+            if not name:
+                results[idx] = {"name": name, "error": "No name provided"}
+                continue
+            reason = blacklist_reason(name)
+            if reason:
+                results[idx] = {"name": name, "prediction": "Not Realistic", "reason": reason}
+                continue
+            if is_whitelisted(name):
+                results[idx] = {"name": name, "prediction": "Realistic"}
+                continue
+            lookup.append(idx)
+
+        # One MGET (and at most one embeddings request) for the whole batch
+        pending = []
+        for idx, (cached, _) in zip(lookup, batch_cache.get_many(model, [names[idx] for idx in lookup])):
+            if cached:
+                results[idx] = dict(cached, name=names[idx])
+            else:
+                pending.append(idx)
+
+        if pending:
+            numbered = "\n".join(f"{num}. {names[idx]}" for num, idx in enumerate(pending, 1))
+            prompt = BATCH_PROMPT + numbered
+
+            try:
+                logger.info("Calling OpenAI API for a batch of %s names with model: '%s'", len(pending), model)
+                response = get_client().chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=8 * len(pending),
+                    temperature=0
+                )
+            except Exception as api_error:
+                logger.error("OpenAI API call failed: %s", api_error)
+                return json_response({"error": f"OpenAI API error: {str(api_error)}"}), 500
+
+            reply_content = response.choices[0].message.content.strip()
+            digits = {int(m.group(1)): m.group(2) for m in _BATCH_LINE.finditer(reply_content)}
+
+            to_cache = []
+            for num, idx in enumerate(pending, 1):
+                digit = digits.get(num)
+                if digit is None:
+                    logger.error("No prediction in batch response for name: '%s'", names[idx])
+                    results[idx] = {"name": names[idx], "error": "Invalid response from model"}
+                    continue
+                body = {
+                    "name": names[idx],
+                    "prediction": "Realistic" if digit == '1' else "Not Realistic"
+                }
+                to_cache.append((names[idx], body))
+                results[idx] = body
+            batch_cache.set_many(model, to_cache)
+
+        return json_response({"results": results}), 200
 
     except Exception as e:
-        logger.exception(f"An unexpected server error occurred: {str(e)}")
-        return jsonify({"error": f"An unexpected server error occurred"}), 500
+        logger.exception("An unexpected server error occurred: %s", e)
+        return json_response({"error": "An unexpected server error occurred"}), 500
 
 # --- Run the Flask App ---
 if __name__ == '__main__':
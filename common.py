@@ -0,0 +1,270 @@
+"""Shared setup for the name-classification Flask apps (app.py, app-precheck*.py).
+
+Holds the OpenAI client pool, logging and the prediction cache (in-process L1, Redis L2, optional
+RediSearch semantic layer). The name rules themselves live in name_rules.py.
+"""
+from flask import current_app, request
+from openai import OpenAI
+import os
+import httpx
+import itertools
+import re
+import orjson
+import hashlib
+import time
+import struct
+import threading
+import queue
+import atexit
+import logging
+import logging.handlers
+import redis
+from redis.commands.search.query import Query
+from cachetools import LRUCache, TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# .env file load
+load_dotenv()
+
+# Set up logging
+# Records go through a queue; a background listener thread does the stderr I/O
+log_queue = queue.Queue(-1)
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, log_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))  # final formatting happens in log_handler
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+logger = logging.getLogger(__name__)
+
+# Initialize OpenAI client with your API key
+api_key = os.getenv("OPENAI_API_KEY")
+if not api_key:
+    raise ValueError("OPENAI_API_KEY environment variable not set. Make sure you have a .env file with this key.")
+
+# Pool of OpenAI clients, each with its own large keep-alive HTTP/2 connection pool.
+# Requests are spread round-robin; raise OPENAI_POOL_SIZE for more independent connections.
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "1"))
+
+def make_openai_client():
+    return OpenAI(
+        api_key=api_key,
+        http_client=httpx.Client(
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+            http2=True,
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+    )
+
+_clients = itertools.cycle([make_openai_client() for _ in range(OPENAI_POOL_SIZE)])
+
+def get_client():
+    """Returns the next OpenAI client from the pool."""
+    return next(_clients)
+
+def json_response(payload):
+    """Serializes payload with orjson into a JSON response."""
+    return current_app.response_class(orjson.dumps(payload), mimetype='application/json')
+
+def read_json():
+    """Parses the request body with orjson; returns None if it is not valid JSON."""
+    try:
+        return orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return None
+
+# Escapes RediSearch TAG special characters in the model name
+_TAG_SPECIAL = re.compile(r"(\W)")
+
+# Prediction cache: exact match in Redis, optional semantic match via RediSearch.
+# Set PREDICTION_CACHE=0 to bypass it entirely (e.g. for accuracy evaluation runs).
+CACHE_ENABLED = os.getenv("PREDICTION_CACHE", "1") != "0"
+CACHE_TTL = 86400  # seconds
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_THRESHOLD = 0.05  # max cosine distance accepted as a hit
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+# Short socket timeouts so an unreachable Redis degrades to a cache miss instead of stalling requests
+redis_client = redis.Redis.from_url(
+    os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+    socket_connect_timeout=0.25,
+    socket_timeout=0.5
+)
+
+# In-process L1 cache in front of Redis (L2): (namespace, model, lower-cased name) -> (result, stored_at)
+L1_TTL = 3600  # seconds
+_L1 = TTLCache(maxsize=4096, ttl=L1_TTL)
+_l1_lock = threading.Lock()  # TTLCache is not thread-safe
+_l1_refresher = ThreadPoolExecutor(max_workers=1)
+_l1_refreshing = set()  # L1 keys with a refresh already queued; guarded by _l1_lock
+
+# Embeddings packed as FLOAT32 bytes, keyed by name
+_embeddings = LRUCache(maxsize=4096)
+_embeddings_lock = threading.Lock()
+
+def get_embeddings(names):
+    """Returns the names' embeddings packed as FLOAT32 bytes for RediSearch.
+
+    Names not seen before are embedded together in a single OpenAI request.
+    """
+    with _embeddings_lock:
+        missing = list(dict.fromkeys(name for name in names if name not in _embeddings))
+    packed = {}
+    if missing:
+        data = get_client().embeddings.create(model=EMBEDDING_MODEL, input=missing).data
+        packed = {name: struct.pack(f"{len(item.embedding)}f", *item.embedding) for name, item in zip(missing, data)}
+    with _embeddings_lock:
+        _embeddings.update(packed)
+        return [packed[name] if name in packed else _embeddings[name] for name in names]
+
+class PredictionCache:
+    """Prediction cache for one app/prompt variant.
+
+    Every key, the semantic index and its key prefix are namespaced by the variant id
+    and a hash of the prompt, so variants never serve each other's verdicts and a
+    prompt edit starts from an empty cache.
+    """
+
+    def __init__(self, variant, *prompt_parts):
+        digest = hashlib.sha1("\n".join(prompt_parts).encode("utf-8")).hexdigest()[:12]
+        self.namespace = f"{variant}:{digest}"
+        self.semantic_index = f"name_idx:{self.namespace}"
+        self.semantic_prefix = f"emb:{self.namespace}:"
+        self._semantic_index_ready = False
+
+    def _key(self, model, name):
+        return f"name:{self.namespace}:{model}:{name.lower()}"
+
+    def _l1_key(self, model, name):
+        return (self.namespace, model, name.lower())
+
+    def _l1_get(self, model, name):
+        with _l1_lock:
+            return _L1.get(self._l1_key(model, name))
+
+    def _l1_set(self, model, name, result):
+        with _l1_lock:
+            _L1[self._l1_key(model, name)] = (result, time.monotonic())
+
+    def _schedule_l1_refresh(self, model, name):
+        """Queues a background refresh unless one is already pending for this entry."""
+        l1_key = self._l1_key(model, name)
+        with _l1_lock:
+            if l1_key in _l1_refreshing:
+                return
+            _l1_refreshing.add(l1_key)
+        _l1_refresher.submit(self._refresh_l1, model, name)
+
+    def _refresh_l1(self, model, name):
+        """Reloads an ageing L1 entry from Redis in the background (stale-while-revalidate).
+
+        If Redis no longer holds the key (expired or flushed), the L1 entry is dropped
+        so the next request goes back to OpenAI instead of serving a stale verdict.
+        """
+        l1_key = self._l1_key(model, name)
+        try:
+            cached = redis_client.get(self._key(model, name))
+            if cached:
+                self._l1_set(model, name, orjson.loads(cached))
+            else:
+                with _l1_lock:
+                    _L1.pop(l1_key, None)
+        except Exception as e:
+            logger.warning("L1 refresh failed for name '%s': %s", name, e)
+        finally:
+            with _l1_lock:
+                _l1_refreshing.discard(l1_key)
+
+    def _ensure_semantic_index(self):
+        """Creates this variant's HNSW vector index on first use."""
+        if self._semantic_index_ready:
+            return
+        try:
+            redis_client.execute_command(
+                "FT.CREATE", self.semantic_index, "ON", "HASH", "PREFIX", "1", self.semantic_prefix,
+                "SCHEMA", "model", "TAG",
+                "embedding", "VECTOR", "HNSW", "6",
+                "TYPE", "FLOAT32", "DIM", EMBEDDING_DIM, "DISTANCE_METRIC", "COSINE"
+            )
+        except redis.ResponseError as e:
+            if "already exists" not in str(e).lower():
+                raise
+        self._semantic_index_ready = True
+
+    def get(self, model, name):
+        """Looks up a cached prediction (L1, then Redis). Returns (result or None, X-Cache value)."""
+        return self.get_many(model, [name])[0]
+
+    def get_many(self, model, names):
+        """Looks up several names at once: one MGET for the L1 misses and, with the semantic
+        cache on, one embeddings request for the exact misses. Returns a list of
+        (result or None, X-Cache value) in the order of names."""
+        found = [(None, "MISS")] * len(names)
+        if not CACHE_ENABLED:
+            return found
+        pending = []
+        for idx, name in enumerate(names):
+            entry = self._l1_get(model, name)
+            if entry:
+                result, stored_at = entry
+                if time.monotonic() - stored_at > L1_TTL / 2:
+                    self._schedule_l1_refresh(model, name)
+                found[idx] = (result, "HIT")
+            else:
+                pending.append(idx)
+        if not pending:
+            return found
+        try:
+            values = redis_client.mget([self._key(model, names[idx]) for idx in pending])
+            misses = []
+            for idx, cached in zip(pending, values):
+                if cached:
+                    result = orjson.loads(cached)
+                    self._l1_set(model, names[idx], result)
+                    found[idx] = (result, "HIT")
+                else:
+                    misses.append(idx)
+            if SEMANTIC_CACHE and misses:
+                self._ensure_semantic_index()
+                model_tag = _TAG_SPECIAL.sub(r"\\\1", model)
+                query = (Query(f"(@model:{{{model_tag}}})=>[KNN 1 @embedding $vec AS dist]")
+                         .sort_by("dist").return_fields("result", "dist").dialect(2))
+                vectors = get_embeddings([names[idx] for idx in misses])
+                for idx, vector in zip(misses, vectors):
+                    docs = redis_client.ft(self.semantic_index).search(query, query_params={"vec": vector}).docs
+                    if docs and float(docs[0].dist) < SEMANTIC_THRESHOLD:
+                        result = orjson.loads(docs[0].result)
+                        self._l1_set(model, names[idx], result)
+                        found[idx] = (result, "SEMANTIC_HIT")
+        except Exception as e:
+            logger.warning("Cache lookup failed for %s name(s): %s", len(pending), e)
+        return found
+
+    def set(self, model, name, result):
+        """Stores a successful prediction in L1 and the exact (and semantic) Redis cache."""
+        self.set_many(model, [(name, result)])
+
+    def set_many(self, model, items):
+        """Stores (name, result) pairs in L1 and in Redis with a single pipelined round trip."""
+        if not CACHE_ENABLED or not items:
+            return
+        for name, result in items:
+            self._l1_set(model, name, result)
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            payloads = [orjson.dumps(result) for _, result in items]
+            for (name, _), payload in zip(items, payloads):
+                pipe.setex(self._key(model, name), CACHE_TTL, payload)
+            if SEMANTIC_CACHE:
+                self._ensure_semantic_index()
+                vectors = get_embeddings([name for name, _ in items])
+                for (name, _), payload, vector in zip(items, payloads, vectors):
+                    key = f"{self.semantic_prefix}{model}:{name.lower()}"
+                    pipe.hset(key, mapping={"model": model, "embedding": vector, "result": payload})
+                    pipe.expire(key, CACHE_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Cache store failed for %s name(s): %s", len(items), e)
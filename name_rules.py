@@ -0,0 +1,122 @@
+"""Name rules shared by the Flask apps and test_models_batch.py.
+
+Holds the allowed models, the 0/1 logit_bias, the local pre-check tables and the checks of
+the minimal-prompt variant (app-precheck-prompt-enhanment.py). Importing it has no side
+effects (no Redis, OpenAI client, logging setup or tokenizer download), so offline
+evaluation can reproduce the variant exactly.
+"""
+import os
+import re
+import logging
+import tiktoken
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Valid OpenAI models
+VALID_MODELS = frozenset(["gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "gpt-4o-mini"])
+
+# '0' and '1' are tokens 15 and 16 in both cl100k_base and o200k_base, the encodings of every VALID_MODELS model
+DEFAULT_BINARY_LOGIT_BIAS = {15: 100, 16: 100}
+
+# Known models need no tokenizer, so nothing is loaded (or downloaded) at import
+BINARY_LOGIT_BIAS = {model: DEFAULT_BINARY_LOGIT_BIAS for model in VALID_MODELS}
+
+def binary_logit_bias(model):
+    """Returns a logit_bias that pins the model's single output token to '0' or '1'.
+
+    Only models missing from BINARY_LOGIT_BIAS go through tiktoken; the result is memoized there.
+    """
+    bias = BINARY_LOGIT_BIAS.get(model)
+    if bias is None:
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            bias = {encoding.encode('0')[0]: 100, encoding.encode('1')[0]: 100}
+        except Exception as e:
+            # tiktoken downloads encodings on first use; fall back rather than fail when offline
+            logger.warning("Could not load tokenizer for model '%s' (%s); using default logit_bias.", model, e)
+            bias = DEFAULT_BINARY_LOGIT_BIAS
+        BINARY_LOGIT_BIAS[model] = bias
+    return bias
+
+# Precompiled patterns
+MULTISPACE = re.compile(r"\s+")
+# Byte table for the invalid-character scan: 0 for ASCII letters, whitespace, '-' and '.', 1 otherwise.
+# Non-ASCII characters are encoded as '?' first, so they map to 1.
+_VALID_BYTES = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz \t\n\r\x0b\x0c-.")
+VALID_CHAR_TABLE = bytes(0 if i in _VALID_BYTES else 1 for i in range(256))
+BAD_DOT = re.compile(r"(?<=\w)\.(?=\w)")
+REPEAT_SYLLABLE = re.compile(r"^([a-z]{2})\1$", re.I)
+
+# Deterministic name lists, decided locally without an OpenAI call
+KEYBOARD_ROWS = ("qwertyuiop", "asdfghjkl", "zxcvbnm")
+# Runs of 4+ keys only: 3-key runs include real names such as 'Yui'
+KEYBOARD_RUNS = frozenset(
+    row[i:j] for row in KEYBOARD_ROWS for i in range(len(row)) for j in range(i + 4, len(row) + 1)
+)
+
+def load_word_list(filename):
+    """Loads a lower-cased word set from a text file next to this script (one per line, '#' comments)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return frozenset(line.strip().lower() for line in f if line.strip() and not line.startswith('#'))
+    except FileNotFoundError:
+        logger.warning("Word list '%s' not found; skipping it.", filename)
+        return frozenset()
+
+NAME_BLACKLIST = load_word_list("name_blacklist.txt")
+NAME_WHITELIST = load_word_list("name_whitelist.txt")
+
+def blacklist_reason(name, repeat_syllables=True):
+    """Returns why the deterministic blacklist rejects a name, or None if it passes.
+
+    Set repeat_syllables=False where single-word names are allowed: doubled-syllable
+    nicknames such as 'Lili' or 'Coco' are real names there.
+    """
+    lowered = name.lower()
+    if lowered in KEYBOARD_RUNS:
+        return "Keyboard pattern"
+    if repeat_syllables and REPEAT_SYLLABLE.match(name):
+        return "Repeated syllable"
+    if all(word in NAME_BLACKLIST for word in lowered.split()):
+        return "Common word, not a name"
+    return None
+
+def is_whitelisted(name):
+    """True for well-known single-word names that are accepted without calling OpenAI."""
+    return name.lower() in NAME_WHITELIST
+
+# Minimal-prompt variant (app-precheck-prompt-enhanment.py), reproduced offline by test_models_batch.py
+PROMPT_TEMPLATE = "Classify '{name}' as a realistic human name (single-word OK). Return only 1 or 0."
+
+def normalize_name(name):
+    # Normalize spaces + camel-case conversion
+    return MULTISPACE.sub(' ', name.strip()).title()
+
+@lru_cache(maxsize=8192)  # pure function of the name; see precheck_name.cache_info()
+def precheck_name(name):
+    # Cheapest checks first; regex scans only run if these pass
+    # 1) Too short to hold 3 letters
+    if len(name) < 3:
+        return False, "Too few letters"
+    # 2) No consecutive hyphens/dots
+    if '--' in name or '..' in name:
+        return False, "Consecutive punctuation"
+    # 3) Invalid characters
+    if b'\x01' in name.encode('ascii', 'replace').translate(VALID_CHAR_TABLE):
+        return False, "Invalid characters"
+    # 4) Dot must have spaces around it
+    if BAD_DOT.search(name):
+        return False, "Invalid dot formatting"
+    # 5) At least 3 letters
+    if sum(1 for c in name if c.isalpha()) < 3:
+        return False, "Too few letters"
+    # 6) Deterministic blacklist (no doubled-syllable rule: single-word names like 'Lulu' are OK)
+    reason = blacklist_reason(name, repeat_syllables=False)
+    if reason:
+        return False, reason
+    return True, None
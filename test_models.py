@@ -1,10 +1,11 @@
 import pandas as pd
 import requests
-import json
-import time
+import orjson
 from sklearn.metrics import accuracy_score
 import logging
-from retrying import retry
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pyrate_limiter import Limiter, Rate, Duration
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,8 +18,23 @@ API_URL = "http://localhost:5000/predict"
 #MODELS = ["gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "gpt-4o-mini"]
 MODELS = ["gpt-4o-mini"]
 
-# Retry decorator for handling temporary API failures
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
+# Token bucket sized to the OpenAI RPM limit; blocks until a slot is free
+limiter = Limiter(Rate(500, Duration.MINUTE))
+
+# Shared session: keeps connections alive and retries temporary API failures
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,  # on 429, sleep for the server's Retry-After
+        allowed_methods=frozenset(["POST"])
+    )
+))
+
 def send_prediction_request(name, model):
     """Send a prediction request to the Flask API."""
     payload = {
@@ -26,7 +42,7 @@ def send_prediction_request(name, model):
         "model": model
     }
     try:
-        response = requests.post(API_URL, json=payload, timeout=10)
+        response = SESSION.post(API_URL, json=payload, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -36,7 +52,11 @@ def send_prediction_request(name, model):
 def load_dataset(file_path):
     """Load the test dataset from a CSV file."""
     try:
-        df = pd.read_csv(file_path)
+        df = pd.read_csv(
+            file_path,
+            usecols=lambda col: col in ('Name', 'Is_Valid'),  # only the two columns we use
+            dtype={'Name': 'string', 'Is_Valid': 'int8'}
+        )
         if 'Name' not in df.columns or 'Is_Valid' not in df.columns:
             raise ValueError("CSV must contain 'Name' and 'Is_Valid' columns")
         return df
@@ -47,11 +67,13 @@ def load_dataset(file_path):
 def evaluate_model(df, model):
     """Evaluate a single model on the dataset."""
     predictions = []
-    actuals = df['Is_Valid'].tolist()
+    actuals = []
 
-    for name in df['Name']:
+    for name, actual in df[['Name', 'Is_Valid']].itertuples(index=False, name=None):
+        actuals.append(actual)
         try:
             logger.info(f"Testing name '{name}' with model '{model}'")
+            limiter.try_acquire("openai")
             result = send_prediction_request(name, model)
             
             if 'prediction' not in result:
@@ -64,9 +86,6 @@ def evaluate_model(df, model):
             predicted_value = 1 if prediction == "Realistic" else 0
             predictions.append(predicted_value)
 
-            # Small delay to respect API rate limits
-            time.sleep(0.5)
-
         except Exception as e:
             logger.error(f"Error processing name '{name}' with model '{model}': {str(e)}")
             predictions.append(0)  # Default to incorrect on error
@@ -114,7 +133,7 @@ def main():
                 }
                 for model in MODELS
             }
-            json.dump(detailed_results, f, indent=2)
+            f.write(orjson.dumps(detailed_results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode())
         logger.info("Detailed results saved to model_comparison_results.json")
 
     except Exception as e:
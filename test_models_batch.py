@@ -0,0 +1,182 @@
+import os
+import orjson
+import time
+import logging
+import tempfile
+from openai import OpenAI
+from dotenv import load_dotenv
+from sklearn.metrics import accuracy_score
+from test_models import load_dataset, evaluate_model as evaluate_model_online
+from name_rules import PROMPT_TEMPLATE, binary_logit_bias, normalize_name, precheck_name, is_whitelisted
+
+# .env file load
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Initialize OpenAI client with your API key
+api_key = os.getenv("OPENAI_API_KEY")
+if not api_key:
+    raise ValueError("OPENAI_API_KEY environment variable not set. Make sure you have a .env file with this key.")
+client = OpenAI(api_key=api_key)
+
+# Models to test
+MODELS = ["gpt-4o-mini"]
+
+# App variant whose /predict is reproduced here: same normalization, pre-check, whitelist,
+# prompt and logit_bias, all imported from name_rules.py. The online fallback must run against this app too.
+VARIANT_FILE = "app-precheck-prompt-enhanment.py"
+
+# Batch job settings
+POLL_INTERVAL_S = 30
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def local_prediction(name):
+    """Return 0 or 1 when the variant decides the name without OpenAI, else None."""
+    if not name:
+        return 0
+    valid, _ = precheck_name(name)
+    if not valid:
+        return 0
+    if is_whitelisted(name):
+        return 1
+    return None
+
+def build_request(idx, name, model):
+    """Build one Batch API line classifying a name as 1 (Realistic) or 0."""
+    prompt = PROMPT_TEMPLATE.format(name=name)
+    return {
+        "custom_id": str(idx),
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 1,
+            "temperature": 0.0,
+            "logit_bias": binary_logit_bias(model)
+        }
+    }
+
+def submit_batch(requests, model):
+    """Write the (idx, name) requests to a temporary JSONL file, upload it and start the batch job."""
+    with tempfile.TemporaryFile() as f:
+        for idx, name in requests:
+            f.write(orjson.dumps(build_request(idx, name, model), option=orjson.OPT_NON_STR_KEYS) + b"\n")
+        f.seek(0)
+        input_file = client.files.create(file=("batch.jsonl", f), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted batch {batch.id} with {len(requests)} names for model '{model}'")
+    return batch.id
+
+def wait_for_batch(batch_id):
+    """Poll the batch job until it reaches a terminal status."""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        logger.info(f"Batch {batch_id} status: {batch.status}")
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        time.sleep(POLL_INTERVAL_S)
+
+def download_predictions(batch, predictions):
+    """Fill predictions (indexed by custom_id) with the 0/1 replies from the batch output file."""
+    output = client.files.content(batch.output_file_id).text
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        idx = int(record["custom_id"])
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            logger.warning(f"Request {idx} failed in batch: {record.get('error')}")
+            continue
+        reply = response["body"]["choices"][0]["message"]["content"].strip()
+        predictions[idx] = 1 if reply[:1] == '1' else 0
+    return predictions
+
+def evaluate_model(df, model):
+    """Evaluate a single model with the Batch API, falling back to the online API on failure.
+
+    Returns (accuracy, predictions, path), where path records which of the two produced the numbers.
+    """
+    names = [normalize_name(name) for name in df['Name'].fillna('')]
+    actuals = df['Is_Valid'].tolist()
+
+    # Names the variant decides locally never reach the model; the rest default to 0 if their line fails
+    predictions = [local_prediction(name) for name in names]
+    requests = [(idx, name) for idx, name in enumerate(names) if predictions[idx] is None]
+    predictions = [0 if pred is None else pred for pred in predictions]
+    logger.info(f"{len(names) - len(requests)} names decided locally by {VARIANT_FILE}, {len(requests)} sent to the Batch API")
+
+    try:
+        if requests:
+            batch = wait_for_batch(submit_batch(requests, model))
+            if batch.status != "completed" or not batch.output_file_id:
+                raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+            download_predictions(batch, predictions)
+    except Exception as e:
+        logger.error(f"Batch evaluation failed for model '{model}': {str(e)}. Falling back to online API.")
+        logger.warning(f"Online fallback sends every name to the app on localhost:5000; make sure it is {VARIANT_FILE}.")
+        accuracy, predictions = evaluate_model_online(df, model)
+        return accuracy, predictions, "online fallback"
+
+    accuracy = accuracy_score(actuals, predictions)
+    return accuracy, predictions, "batch"
+
+def main():
+    # Path to your test dataset
+    dataset_path = "test_names.csv"
+
+    try:
+        # Load dataset
+        df = load_dataset(dataset_path)
+        logger.info(f"Loaded dataset with {len(df)} names")
+
+        # Evaluate each model
+        results = {}
+        for model in MODELS:
+            logger.info(f"Evaluating model: {model}")
+            start_time = time.time()
+            accuracy, predictions, path = evaluate_model(df, model)
+            results[model] = {
+                "accuracy": accuracy,
+                "predictions": predictions,
+                "path": path
+            }
+            logger.info(f"Model {model} accuracy: {accuracy:.4f} in {time.time() - start_time:.2f}s (via {path})")
+
+        # Print summary
+        print("\n=== Accuracy Comparison ===")
+        for model in MODELS:
+            accuracy = results[model]["accuracy"]
+            print(f"{model}: {accuracy:.4f} ({accuracy*100:.4f}%) via {results[model]['path']}")
+
+        # Save detailed results to a file
+        with open("model_comparison_results.json", "w") as f:
+            detailed_results = {
+                model: {
+                    "variant": VARIANT_FILE,
+                    "path": results[model]["path"],
+                    "accuracy": results[model]["accuracy"],
+                    "predictions": [
+                        {"name": name, "actual": actual, "predicted": pred}
+                        for name, actual, pred in zip(df['Name'], df['Is_Valid'], results[model]["predictions"])
+                    ]
+                }
+                for model in MODELS
+            }
+            f.write(orjson.dumps(detailed_results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode())
+        logger.info("Detailed results saved to model_comparison_results.json")
+
+    except Exception as e:
+        logger.error(f"Batch test script failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
 import pandas as pd
-import requests
-import json
+import httpx
+import asyncio
+import orjson
 import logging
 import time
-from retrying import retry
+from abc import ABC, abstractmethod
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_fixed
 from sklearn.metrics import accuracy_score
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Flask API endpoint
+# Flask API endpoints
 API_URL = "http://localhost:5000/predict"
+BATCH_API_URL = "http://localhost:5000/predict_batch"
 
 # Models to test
 MODELS = ["gpt-4.1-mini","gpt-4o-mini"]
@@ -20,48 +22,156 @@ MODELS = ["gpt-4.1-mini","gpt-4o-mini"]
 # Configure concurrency
 MAX_WORKERS = 20  # adjust based on your API rate limits
 
-# Retry decorator for handling temporary API failures
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
-def send_prediction_request(name, model, session):
-    """Send a prediction request to the Flask API using a shared session."""
+# Batching: group names into /predict_batch calls instead of one request per name.
+# Only app.py serves /predict_batch; against the precheck variants the batcher falls back to /predict.
+USE_BATCH_ENDPOINT = False
+MAX_BATCH_SIZE = 50
+BATCH_WAIT_TIMEOUT_S = 0.1
+
+def is_retryable(error):
+    """A missing endpoint (404) will not appear on retry; everything else is worth another attempt."""
+    return not (isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 404)
+
+async def send_prediction_request(name, model, client):
+    """Send a prediction request to the Flask API using a shared async client, retrying temporary failures."""
     payload = {"name": name, "model": model}
-    response = session.post(API_URL, json=payload, timeout=10)
-    response.raise_for_status()
-    return response.json()
+    async for attempt in AsyncRetrying(stop=stop_after_attempt(3), wait=wait_fixed(2), reraise=True):
+        with attempt:
+            response = await client.post(API_URL, json=payload)
+            response.raise_for_status()
+            return response.json()
+
+
+class AsyncBatcher(ABC):
+    """Collects items submitted concurrently and hands them to process_batch in groups.
+
+    A batch is dispatched once it holds max_batch_size items or batch_wait_timeout_s
+    after its first item arrived, whichever comes first.
+    """
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, batch_wait_timeout_s=BATCH_WAIT_TIMEOUT_S):
+        self.max_batch_size = max_batch_size
+        self.batch_wait_timeout_s = batch_wait_timeout_s
+        self._pending = []  # (item, future) pairs waiting for the next batch
+        self._timer = None
+        self._tasks = set()
+
+    @abstractmethod
+    async def process_batch(self, batch):
+        """Return one result per item in batch, in the same order."""
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_wait_timeout_s, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.ensure_future(self._run(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending):
+        try:
+            results = await self.process_batch([item for item, _ in pending])
+            if len(results) != len(pending):
+                raise ValueError(f"Expected {len(pending)} results, got {len(results)}")
+            for (_, future), result in zip(pending, results):
+                future.set_result(result)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+
+class PredictionBatcher(AsyncBatcher):
+    """Batches names for one model into /predict_batch requests."""
+
+    def __init__(self, client, model, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.model = model
+        self.sem = asyncio.Semaphore(MAX_WORKERS)
+        self.batch_supported = True
+
+    async def process_batch(self, batch):
+        if self.batch_supported:
+            try:
+                return await self._post_batch(batch)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404:
+                    raise
+                logger.warning("%s not found; falling back to one /predict request per name", BATCH_API_URL)
+                self.batch_supported = False
+        return await asyncio.gather(*(self._post_one(name) for name in batch))
+
+    async def _post_batch(self, batch):
+        payload = {"names": batch, "model": self.model}
+        async with self.sem:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(3), wait=wait_fixed(2), retry=retry_if_exception(is_retryable), reraise=True
+            ):
+                with attempt:
+                    response = await self.client.post(BATCH_API_URL, json=payload)
+                    response.raise_for_status()
+                    return response.json()["results"]
+
+    async def _post_one(self, name):
+        async with self.sem:
+            return await send_prediction_request(name, self.model, self.client)
 
 
 def load_dataset(file_path):
     """Load the test dataset from a CSV file."""
-    df = pd.read_csv(file_path)
+    df = pd.read_csv(
+        file_path,
+        usecols=lambda col: col in ('Name', 'Is_Valid'),  # only the two columns we use
+        dtype={'Name': 'string', 'Is_Valid': 'int8'}
+    )
     if 'Name' not in df.columns or 'Is_Valid' not in df.columns:
         raise ValueError("CSV must contain 'Name' and 'Is_Valid' columns")
     return df
 
 
-def evaluate_model(df, model):
-    """Evaluate a single model on the dataset using parallel requests."""
+async def evaluate_model(df, model):
+    """Evaluate a single model on the dataset using concurrent requests."""
     actuals = df['Is_Valid'].tolist()
     names = df['Name'].tolist()
     predictions = [None] * len(names)
 
-    session = requests.Session()
+    sem = asyncio.Semaphore(MAX_WORKERS)
     start_time = time.time()
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_index = {
-            executor.submit(send_prediction_request, name, model, session): idx
-            for idx, name in enumerate(names)
-        }
-        for future in as_completed(future_to_index):
-            idx = future_to_index[future]
+    async with httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        timeout=10.0
+    ) as client:
+        batcher = PredictionBatcher(client, model)
+
+        async def one(idx, name):
             try:
-                result = future.result()
+                if USE_BATCH_ENDPOINT:
+                    result = await batcher.submit(name)
+                else:
+                    async with sem:
+                        result = await send_prediction_request(name, model, client)
                 pred = result.get('prediction')
                 predictions[idx] = 1 if pred == 'Realistic' else 0
             except Exception as e:
-                logger.error(f"Error for name '{names[idx]}': {e}")
+                logger.error(f"Error for name '{name}': {e}")
                 predictions[idx] = 0  # default on error
 
+        await asyncio.gather(*(one(idx, name) for idx, name in enumerate(names)))
+
     duration = time.time() - start_time
     accuracy = accuracy_score(actuals, predictions)
     logger.info(f"Model {model} completed in {duration:.2f}s with accuracy {accuracy:.4f}")
@@ -75,7 +185,7 @@ def main():
 
     results = {}
     for model in MODELS:
-        accuracy, preds = evaluate_model(df, model)
+        accuracy, preds = asyncio.run(evaluate_model(df, model))
         results[model] = {"accuracy": accuracy, "predictions": preds}
 
     print("\n=== Accuracy Comparison ===")
@@ -94,7 +204,7 @@ def main():
             }
             for model, res in results.items()
         }
-        json.dump(detailed, f, indent=2)
+        f.write(orjson.dumps(detailed, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode())
     logger.info("Detailed results saved to model_comparison_results.json")
 
 
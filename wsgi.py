@@ -0,0 +1,6 @@
+# WSGI entry point for production, e.g.:
+#   gunicorn -k gevent -w $((2 * $(nproc))) --worker-connections 200 --timeout 60 wsgi:app
+from app import app
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000, debug=False)